@@ -0,0 +1,96 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Tuple
+
+# LRU pool of live chat sessions keyed by session_id.
+# Pooling keeps each session's turns as structured chat history instead of the
+# flattened "HISTORY:" prompt. It does not shrink requests: the SDK ChatSession
+# keeps history client-side and resends all of it with every send_message, so a
+# pooled chat is rebuilt once it would send more than `window` prior messages,
+# the same bound as the HISTORY prompt.
+# SDK agnostic: chats only need `history` and `send_message`.
+
+
+def to_turns(history: List[Dict[str, Any]], window: int) -> List[Tuple[str, List[str]]]:
+    """
+    Converts the last `window` repository messages into alternating
+    (role, [texts]) turns. Leading model turns are dropped and consecutive
+    turns of the same role (e.g. after a failed agent call) are merged.
+    """
+    turns = []
+    for m in history[-window:]:
+        role = m.get("role")
+        text = m.get("content", "")
+        if role not in ("user", "model") or not text:
+            continue
+        if not turns and role == "model":
+            continue
+        if turns and turns[-1][0] == role:
+            turns[-1][1].append(text)
+        else:
+            turns.append((role, [text]))
+    return turns
+
+
+class ChatPool:
+    def __init__(self, max_size: int, idle_seconds: float, window: int, clock: Callable[[], float] = time.time):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.window = window
+        self._clock = clock
+        # session_id -> (chat, last_used, expected_history_len)
+        self._chats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._chats)
+
+    def __contains__(self, session_id):
+        return session_id in self._chats
+
+    def _evict_idle(self, now):
+        # Entries are kept in LRU order, so idle ones are always at the front
+        while self._chats:
+            entry = next(iter(self._chats.values()))
+            if now - entry[1] < self.idle_seconds:
+                break
+            self._chats.popitem(last=False)
+
+    def get(self, session_id: str, history: List[Dict[str, Any]], start_chat: Callable):
+        """
+        Returns (chat, reused). The pooled chat is rebuilt with
+        start_chat(to_turns(history)) on a miss, when its history length no longer
+        matches the repository (e.g. another instance served the session), or when
+        it holds more than `window` messages.
+        """
+        now = self._clock()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._chats.get(session_id)
+            reused = (
+                entry is not None
+                and entry[2] == len(history)
+                and len(entry[0].history) <= self.window
+            )
+        chat = entry[0] if reused else start_chat(to_turns(history, self.window))
+        with self._lock:
+            # Anticipate this turn's user + model messages being persisted
+            self._chats[session_id] = (chat, now, len(history) + 2)
+            self._chats.move_to_end(session_id)
+            while len(self._chats) > self.max_size:
+                self._chats.popitem(last=False)
+        return chat, reused
+
+    def send(self, session_id: str, chat, prompt: str):
+        """Sends on a pooled chat, evicting it on failure so a half-applied turn is never reused."""
+        try:
+            return chat.send_message(prompt)
+        except Exception:
+            self.evict(session_id)
+            raise
+
+    def evict(self, session_id: str):
+        """Drops a pooled chat so the next turn rebuilds it from the repository."""
+        with self._lock:
+            self._chats.pop(session_id, None)
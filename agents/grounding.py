@@ -0,0 +1,290 @@
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional, Iterable
+
+# Local post-processor that cross-checks the concrete facts in a model answer
+# (Tour IDs, durations, prices) against the grounding chunks returned with it.
+# Pure Python and regex based so it runs in microseconds; re-asking the model
+# is only done by the caller when validation fails.
+
+PASSED = "passed"
+FAILED = "failed"
+UNVERIFIABLE = "unverifiable"
+
+NOT_AVAILABLE = "Dato no disponible en promociones"
+
+# Tour IDs must contain at least one digit so "Tour ID: No encontrado" is not a claim.
+_ID = r"[a-z0-9][a-z0-9_\-]*"
+_ID_TOKEN_RE = re.compile(rf"(?<![a-z0-9_\-])({_ID})(?![a-z0-9_\-])", re.IGNORECASE)
+# "Tour ID: X", "| Tour ID | X |" and "Tour IDs: X, Y y Z"; the IDs are split from the tail
+_TOUR_ID_LABEL_RE = re.compile(
+    rf"tour\s*ids?[\s*_:#|\-]*((?:{_ID})(?:\s*(?:,|/|\by\b|\band\b)\s*\**(?:{_ID}))*)",
+    re.IGNORECASE,
+)
+_TABLE_LABEL_RE = re.compile(r"^\**\s*tour\s*ids?\s*\**$", re.IGNORECASE)
+_DURATION_RE = re.compile(r"\b(\d{1,3})\s*(d[ií]as?|noches?|days?|nights?)\b", re.IGNORECASE)
+_AMOUNT = r"\d[\d.,]*\d|\d"
+_PRICE_RE = re.compile(
+    rf"(?P<pre>us\$|usd|eur|€|\$)\s*(?P<amount1>{_AMOUNT})"
+    rf"|\b(?P<amount2>{_AMOUNT})\s*(?P<post>usd|eur|€|d[oó]lares)",
+    re.IGNORECASE,
+)
+
+_TITLE_CACHE_SIZE = 1024
+_TITLE_CACHE: "OrderedDict[str, str]" = OrderedDict()
+
+
+@dataclass
+class Claim:
+    kind: str  # "tour_id" | "duration" | "price"
+    text: str  # Readable claim, used in warnings and retry prompts
+    raw: str  # The value alone as written, e.g. "TR-2041" in "Tour ID: TR-2041"
+    value: str  # Normalized value used for matching
+    start: int = 0  # Span replaced in strip mode: the ID for Tour IDs,
+    end: int = 0  # the whole amount/duration with its currency/unit otherwise
+
+
+@dataclass
+class GroundingReport:
+    status: str
+    claims: int = 0
+    unsupported: List[Dict[str, str]] = field(default_factory=list)
+    sources: int = 0
+    elapsed_us: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _normalize(text: str) -> str:
+    """Lowercases and strips accents so 'Días' and 'dias' compare equal."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _unit(raw: str) -> str:
+    raw = _normalize(raw)
+    return "n" if raw.startswith(("noche", "night")) else "d"
+
+
+def _currency(raw: str) -> str:
+    """'$', 'US$', 'USD' and 'dólares' are all USD; '€' and 'EUR' are EUR."""
+    return "eur" if _normalize(raw) in ("eur", "€") else "usd"
+
+
+def _amount(raw: str) -> str:
+    """
+    Parses a price into a canonical "1290.00" string.
+    The last ',' or '.' followed by one or two final digits is the decimal mark;
+    every other separator is a thousands separator.
+    """
+    decimals = "00"
+    if len(raw) > 3 and raw[-3] in ",.":
+        raw, decimals = raw[:-3], raw[-2:]
+    elif len(raw) > 2 and raw[-2] in ",.":
+        raw, decimals = raw[:-2], raw[-1] + "0"
+    return f"{int(re.sub(r'[.,]', '', raw))}.{decimals}"
+
+
+def _is_id(token: str) -> bool:
+    return any(c.isdigit() for c in token)
+
+
+def _shape(token: str) -> str:
+    """'TR-2041' -> 'a-9'; used to tell list items that are IDs from other numbers."""
+    return re.sub(r"[a-z]+", "a", re.sub(r"\d+", "9", token.lower()))
+
+
+def _tour_id_spans(content: str) -> List[tuple]:
+    """
+    Finds (start, end) spans of Tour IDs after a "Tour ID(s)" label, including
+    comma/"y" lists, and in the "Tour ID" column of markdown tables.
+    """
+    spans = []
+    for m in _TOUR_ID_LABEL_RE.finditer(content):
+        shape = None
+        for t in _ID_TOKEN_RE.finditer(m.group(1)):
+            token = t.group(1)
+            if token.lower() in ("y", "and"):
+                continue
+            # List items must look like the first ID, so "TR-2041, 10 días" stops at "10"
+            if not _is_id(token) or (shape is not None and _shape(token) != shape):
+                break
+            shape = _shape(token)
+            spans.append((m.start(1) + t.start(1), m.start(1) + t.end(1)))
+
+    column = None
+    offset = 0
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        if not stripped.startswith("|"):
+            column = None
+        else:
+            cells = stripped.strip("|").split("|")
+            labels = [i for i, c in enumerate(cells) if _TABLE_LABEL_RE.match(c.strip())]
+            if labels:
+                column = labels[0]
+            elif column is not None and column < len(cells):
+                cell = cells[column]
+                token = _ID_TOKEN_RE.search(cell)
+                if token and _is_id(token.group(1)) and cell.strip(" *") == token.group(1):
+                    # Locate the cell in the original line to get absolute offsets
+                    cell_start = line.index("|") + 1 + sum(len(c) + 1 for c in cells[:column])
+                    spans.append((offset + cell_start + token.start(1), offset + cell_start + token.end(1)))
+        offset += len(line)
+    return sorted(set(spans))
+
+
+def _tour_ids(text: str) -> set:
+    return {_normalize(text[a:b]) for a, b in _tour_id_spans(text)}
+
+
+def _prices(text: str) -> set:
+    return {
+        f"{_currency(m.group('pre') or m.group('post'))}:{_amount(m.group('amount1') or m.group('amount2'))}"
+        for m in _PRICE_RE.finditer(text)
+    }
+
+
+def _title_from_uri(uri: str) -> str:
+    name = uri.rstrip("/").rsplit("/", 1)[-1]
+    return name.rsplit(".", 1)[0] if "." in name else name
+
+
+def resolve_title(uri: str, title: Optional[str] = None) -> str:
+    """
+    Resolves a human readable title for a source URI.
+    Titles reported by Vertex AI Search (or derived from the file name) are kept
+    in a bounded LRU cache; a reported title always replaces a derived one.
+    """
+    if title:
+        _TITLE_CACHE[uri] = title
+    elif uri not in _TITLE_CACHE:
+        _TITLE_CACHE[uri] = _title_from_uri(uri)
+    _TITLE_CACHE.move_to_end(uri)
+    while len(_TITLE_CACHE) > _TITLE_CACHE_SIZE:
+        _TITLE_CACHE.popitem(last=False)
+    return _TITLE_CACHE[uri]
+
+
+def collect_sources(chunks: Optional[Iterable[Any]]) -> List[Dict[str, str]]:
+    """
+    Converts Vertex grounding chunks into deduplicated source dicts
+    ({'uri', 'title', 'text'}), preserving first-seen order.
+    Texts of repeated URIs are merged.
+    """
+    by_uri: Dict[str, Dict[str, str]] = {}
+    for chunk in chunks or []:
+        ctx = getattr(chunk, "retrieved_context", None) or getattr(chunk, "web", None)
+        uri = getattr(ctx, "uri", "") if ctx else ""
+        if not uri:
+            continue
+        text = getattr(ctx, "text", "") or ""
+        source = by_uri.get(uri)
+        if source is None:
+            by_uri[uri] = {
+                "uri": uri,
+                "title": resolve_title(uri, getattr(ctx, "title", None)),
+                "text": text,
+            }
+        elif text and text not in source["text"]:
+            source["text"] = f"{source['text']}\n{text}" if source["text"] else text
+    return list(by_uri.values())
+
+
+def extract_claims(content: str) -> List[Claim]:
+    """Parses Tour IDs, durations and prices stated in a model response."""
+    claims = []
+    for a, b in _tour_id_spans(content):
+        raw = content[a:b]
+        claims.append(Claim("tour_id", f"Tour ID: {raw}", raw, _normalize(raw), a, b))
+    for m in _DURATION_RE.finditer(content):
+        claims.append(Claim("duration", m.group(0), m.group(0), f"{int(m.group(1))}{_unit(m.group(2))}", m.start(), m.end()))
+    for m in _PRICE_RE.finditer(content):
+        raw = m.group("amount1") or m.group("amount2")
+        value = f"{_currency(m.group('pre') or m.group('post'))}:{_amount(raw)}"
+        claims.append(Claim("price", m.group(0), raw, value, m.start(), m.end()))
+    return claims
+
+
+def _is_supported(claim: Claim, corpus: str, tour_ids: set, durations: set, prices: set) -> bool:
+    if claim.kind == "tour_id":
+        # Sources may list the ID without the "Tour ID" label, so also accept the
+        # exact standalone token ("2041" does not match "TR-2041")
+        return claim.value in tour_ids or re.search(
+            rf"(?<![a-z0-9_\-]){re.escape(claim.value)}(?![a-z0-9_\-])", corpus
+        ) is not None
+    if claim.kind == "duration":
+        return claim.value in durations
+    return claim.value in prices
+
+
+def validate(content: str, sources: Optional[List[Dict[str, str]]]) -> GroundingReport:
+    """
+    Cross-checks the claims in `content` against the grounding sources.
+
+    `sources=None` means the agent does not expose grounding data, and the
+    report is UNVERIFIABLE. An empty list means the model answered without
+    grounding, so any concrete claim fails.
+    """
+    start = time.perf_counter()
+    claims = extract_claims(content)
+
+    if sources is None or (sources and not any(s.get("text") for s in sources)):
+        status, unsupported = (UNVERIFIABLE if claims else PASSED), []
+    else:
+        corpus = _normalize("\n".join(f"{s.get('title', '')}\n{s.get('text', '')}" for s in sources))
+        durations = {f"{int(n)}{_unit(u)}" for n, u in _DURATION_RE.findall(corpus)}
+        tour_ids = _tour_ids(corpus)
+        prices = _prices(corpus)
+        unsupported = [
+            {"kind": c.kind, "text": c.text, "value": c.raw}
+            for c in claims
+            if not _is_supported(c, corpus, tour_ids, durations, prices)
+        ]
+        status = FAILED if unsupported else PASSED
+
+    return GroundingReport(
+        status=status,
+        claims=len(claims),
+        unsupported=unsupported,
+        sources=len(sources or []),
+        elapsed_us=round((time.perf_counter() - start) * 1e6, 1),
+    )
+
+
+def build_retry_prompt(prompt: str, report: GroundingReport) -> str:
+    """Appends a targeted correction listing only the claims that failed validation."""
+    listed = "\n".join(f"- {u['text']}" for u in report.unsupported)
+    return (
+        f"{prompt}\n\n"
+        "VERIFICACIÓN: Los siguientes datos no aparecen en los documentos recuperados:\n"
+        f"{listed}\n"
+        f'Corrige la respuesta usando solo datos de los documentos. Si no están, responde: "{NOT_AVAILABLE}".'
+    )
+
+
+def enforce(content: str, report: GroundingReport, mode: Optional[str] = None) -> str:
+    """
+    Applies the GROUNDING_MODE policy to a response that failed validation.
+    'flag' (default) appends a warning listing unsupported data;
+    'strip' replaces each unsupported Tour ID, amount (with its currency) or
+    duration with NOT_AVAILABLE, keeping labels such as "Tour ID:" or "Precio:".
+    """
+    if report.status != FAILED:
+        return content
+    mode = mode or os.getenv("GROUNDING_MODE", "flag")
+    if mode == "strip":
+        # The report was built from this same content, so re-extracting yields the
+        # spans of the unsupported claims; replace right to left to keep offsets valid
+        rejected = {(u["kind"], u["text"]) for u in report.unsupported}
+        for c in sorted(extract_claims(content), key=lambda c: c.start, reverse=True):
+            if (c.kind, c.text) in rejected:
+                content = content[:c.start] + NOT_AVAILABLE + content[c.end:]
+        return content
+    listed = ", ".join(u["text"] for u in report.unsupported)
+    return f"{content}\n\n⚠️ Datos no verificados en promociones: {listed}"
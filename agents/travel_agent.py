@@ -1,6 +1,11 @@
 import os
+import time
+from typing import List, Dict, Any, Optional
 import vertexai
-from vertexai.preview.generative_models import GenerativeModel, Tool, grounding
+from vertexai.preview.generative_models import GenerativeModel, Tool, Content, Part, grounding
+
+from agents import grounding as grounding_validator
+from agents.chat_pool import ChatPool
 
 # Try to import ADK, if not found, use standard SDK implementation wrapping
 try:
@@ -16,6 +21,12 @@ except ImportError:
 PROJECT_ID = os.getenv("PROJECT_ID", "pdf-to-markdown-483017")
 LOCATION = os.getenv("LOCATION", "us-central1")
 DATA_STORE_ID = os.getenv("DATA_STORE_ID", "projects/pdf-to-markdown-483017/locations/global/collections/default_collection/dataStores/dato_1767316786678")
+MODEL_NAME = os.getenv("MODEL_NAME", "gemini-2.5-pro")
+
+# ChatSession pool (standard SDK implementation)
+CHAT_POOL_SIZE = int(os.getenv("CHAT_POOL_SIZE", "256"))
+CHAT_POOL_IDLE_SECONDS = int(os.getenv("CHAT_POOL_IDLE_SECONDS", "1800"))
+CHAT_HISTORY_WINDOW = 15  # Same window main.py uses for the HISTORY prompt
 
 # Initialize Vertex AI
 try:
@@ -63,10 +74,7 @@ else:
                 )
             ]
             
-            self.model = GenerativeModel(
-                "gemini-2.5-pro", 
-                tools=self.tools,
-                system_instruction="""FILOSOFÍA DE OPERACIÓN: "THE MINIMUM VIABLE RESPONSE"
+            self.system_instruction = """FILOSOFÍA DE OPERACIÓN: "THE MINIMUM VIABLE RESPONSE"
 Tu comunicación es quirúrgica. No entretengas ni simules empatía. Eres una herramienta de precisión. El éxito se mide por la velocidad de resolución con el menor conteo de tokens.
 
 REGLAS DE COMPORTAMIENTO:
@@ -103,31 +111,73 @@ REGLAS DE GROUNDING:
 - Solo usa información de los documentos (Vertex AI Search).
 - Si no está, responde: "Dato no disponible en promociones".
 """
+            self.model = GenerativeModel(
+                MODEL_NAME, 
+                tools=self.tools,
+                system_instruction=self.system_instruction
             )
 
-        def query(self, prompt: str):
-            # Create a chat session (stateless for this wrapper, or stateful if we keep history)
-            # The API caller manages history string construction, but for Vertex Chat, 
-            # ideally we pass the history object.
-            # For simplicity in this wrapper, we'll treat it as a single turn with context 
-            # or rely on the prompt containing the history.
-            
-            # Note: prompt passed here already has HISTORY: ... constructed in main.py
-            # But Grounding works best with specific queries.
-            # For this 'Shim', we will send the full prompt.
-            
-            chat = self.model.start_chat()
-            response = chat.send_message(prompt)
+            # Live ChatSessions keyed by session_id (LRU, idle eviction)
+            self.chat_pool = ChatPool(CHAT_POOL_SIZE, CHAT_POOL_IDLE_SECONDS, CHAT_HISTORY_WINDOW)
+
+        # Tells api.main that query() accepts session_id/history for pooled chats
+        supports_sessions = True
+
+        def _to_contents(self, turns):
+            return [Content(role=role, parts=[Part.from_text(t) for t in texts]) for role, texts in turns]
+
+        def chat_for(self, session_id: str, history: Optional[List[Dict[str, Any]]] = None):
+            """
+            Returns (chat, reused) from the pool, rebuilding the chat from the
+            repository history when needed. Loads the history itself only when the
+            caller does not supply it.
+            """
+            if history is None:
+                from persistence import repository
+                history = repository.get_session(session_id)
+            return self.chat_pool.get(
+                session_id,
+                history,
+                lambda turns: self.model.start_chat(history=self._to_contents(turns)),
+            )
+
+        def evict(self, session_id):
+            """Drops a pooled chat so the next turn rebuilds it from the repository."""
+            self.chat_pool.evict(session_id)
+
+        def query(self, prompt: str, session_id: Optional[str] = None, history: Optional[List[Dict[str, Any]]] = None):
+            """
+            With session_id, `prompt` is only the new user message and is sent to the
+            pooled ChatSession for that session, whose prior turns (at most
+            CHAT_HISTORY_WINDOW messages, like the HISTORY prompt) are structured chat
+            history that the SDK resends every turn. Without it, a one-off
+            chat is used and `prompt` must carry the HISTORY: ... block built in main.py.
+            """
+            pooled = False
+            start = time.perf_counter()
+            if session_id:
+                chat, pooled = self.chat_for(session_id, history)
+                response = self.chat_pool.send(session_id, chat, prompt)
+            else:
+                response = self.model.start_chat().send_message(prompt)
+            latency_ms = round((time.perf_counter() - start) * 1000, 1)
+
+            usage_metadata = getattr(response, "usage_metadata", None)
+            usage = {
+                "prompt_tokens": getattr(usage_metadata, "prompt_token_count", 0),
+                "cached_tokens": getattr(usage_metadata, "cached_content_token_count", 0),
+                "latency_ms": latency_ms,
+                "pooled": pooled,
+            }
             
             # Extract text and citations
             text = response.text
             
-            # Attempt to extract citations/grounding metadata
-            citations = []
+            # Attempt to extract citations/grounding metadata (deduplicated by URI)
+            sources = []
             if response.candidates and response.candidates[0].grounding_metadata.grounding_chunks:
-                for chunk in response.candidates[0].grounding_metadata.grounding_chunks:
-                    if chunk.retrieved_context:
-                        citations.append(chunk.retrieved_context.uri) # Or title
+                sources = grounding_validator.collect_sources(response.candidates[0].grounding_metadata.grounding_chunks)
+            citations = [s["uri"] for s in sources]
                         
             # Return an object that mimics what main.py expects (object with .text or str)
             # We will return the text, and rely on main.py to handle it?
@@ -136,15 +186,17 @@ REGLAS DE GROUNDING:
             # I should return a simple object.
             
             class AgentResponse:
-                def __init__(self, text, citations):
+                def __init__(self, text, citations, sources, usage):
                     self.text = text
                     self.citations = citations
+                    self.sources = sources
+                    self.usage = usage
                 def __str__(self):
                     return self.text
             
-            return AgentResponse(text, citations)
+            return AgentResponse(text, citations, sources, usage)
             
-        def __call__(self, prompt: str):
-            return self.query(prompt)
+        def __call__(self, prompt: str, **kwargs):
+            return self.query(prompt, **kwargs)
 
     root_agent = VertexStandardAgent()
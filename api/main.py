@@ -11,6 +11,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from persistence import repository
 from agents.travel_agent import root_agent
+from agents import grounding
+
+# Targeted re-asks allowed when a response fails local grounding validation
+GROUNDING_MAX_RETRIES = int(os.getenv("GROUNDING_MAX_RETRIES", "1"))
 
 app = FastAPI(title="Travel-Mind API", version="1.0.0")
 
@@ -32,6 +36,37 @@ class MessageResponse(BaseModel):
     citations: List[Any] = []
     session_id: str
 
+def _run_agent(prompt: str, session_id: Optional[str] = None, message: Optional[str] = None, history: Optional[List[Dict[str, Any]]] = None):
+    """
+    Invokes the agent and normalizes its output to (content, citations, sources, usage).
+    `sources` and `usage` are None when the agent does not expose them.
+    Agents with pooled chat sessions receive `message` plus the session history
+    (kept as structured chat turns); others receive the full `prompt` with the
+    HISTORY block.
+    """
+    # NOTE: This invoke method is hypothetical based on standard agent frameworks.
+    # Adjust based on actual ADK method (e.g., .invoke, .query, .ask).
+    if session_id and getattr(root_agent, 'supports_sessions', False):
+        agent_response = root_agent.query(message, session_id=session_id, history=history)
+    elif hasattr(root_agent, 'query'):
+        agent_response = root_agent.query(prompt)
+    elif hasattr(root_agent, '__call__'):
+        agent_response = root_agent(prompt)
+    else:
+        agent_response = "Error: Agent method unknown"
+
+    # Safe parsing of response
+    citations = []
+    sources = getattr(agent_response, 'sources', None)
+    usage = getattr(agent_response, 'usage', None)
+    if hasattr(agent_response, 'text'):
+        content = agent_response.text
+        if hasattr(agent_response, 'citations'):
+            citations = agent_response.citations
+    else:
+        content = str(agent_response)
+    return content, citations, sources, usage
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
@@ -85,41 +120,50 @@ async def send_message(
     full_prompt = f"HISTORY:\n{formatted_history}\n\nUSER:\n{req.message}"
     
     try:
-        # NOTE: This invoke method is hypothetical based on standard agent frameworks.
-        # Adjust based on actual ADK method (e.g., .invoke, .query, .ask).
-        # Since I mocked it or it's unknown, I'll use a generic 'query' and wrap in try/except.
-        if hasattr(root_agent, 'query'):
-            agent_response = root_agent.query(full_prompt)
-        elif hasattr(root_agent, '__call__'):
-            agent_response = root_agent(full_prompt)
-        else:
-             agent_response = "Error: Agent method unknown"
-
-        # Safe parsing of response
-        citations = []
-        if hasattr(agent_response, 'text'):
-             content = agent_response.text
-             if hasattr(agent_response, 'citations'):
-                 citations = agent_response.citations
-        else:
-             content = str(agent_response)
-        
-        # Grounding Check
-        if "Tour ID" not in content and "No encontrado" not in content:
-            # In logic: retry or append warning
-            pass
-            
+        content, citations, sources, usage = _run_agent(
+            full_prompt, session_id=req.session_id, message=req.message, history=history
+        )
+
+        # Grounding Check: validate Tour IDs, durations and prices locally against
+        # the returned sources; only re-ask the model when validation fails.
+        report = grounding.validate(content, sources)
+        validation_us = report.elapsed_us
+        retries = 0
+        while report.status == grounding.FAILED and retries < GROUNDING_MAX_RETRIES:
+            retries += 1
+            # Retry in the same context format as the failed turn: drop the pooled chat
+            # (it holds the rejected answer) so it is rebuilt from the repository history
+            if hasattr(root_agent, 'evict'):
+                root_agent.evict(req.session_id)
+            content, citations, sources, usage = _run_agent(
+                grounding.build_retry_prompt(full_prompt, report),
+                session_id=req.session_id,
+                message=grounding.build_retry_prompt(req.message, report),
+                history=history,
+            )
+            report = grounding.validate(content, sources)
+            validation_us += report.elapsed_us
+        content = grounding.enforce(content, report)
+        if retries or report.status == grounding.FAILED:
+            # The pooled chat holds the correction prompt or an unflagged answer, not
+            # what gets persisted; rebuild it next turn
+            if hasattr(root_agent, 'evict'):
+                root_agent.evict(req.session_id)
+
     except Exception as e:
         # Log error and return failure
         # For debug, print full error
         print(f"Agent Execution Error: {e}")
         raise HTTPException(status_code=500, detail=f"Agent execution failed: {str(e)}")
 
+    grounding_meta = {**report.to_dict(), "retries": retries, "validation_us": round(validation_us, 1)}
+    print(f"Grounding: session={req.session_id} {grounding_meta} usage={usage}")
+
     # Save Model Response
     model_msg = {
         "role": "model", 
         "content": content,
-        "metadata": {"citations": citations} 
+        "metadata": {"citations": citations, "grounding": grounding_meta, "usage": usage}
     }
     repository.save_message(req.session_id, model_msg)
 
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import uuid
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents import travel_agent
+from agents.travel_agent import root_agent
+
+# Compares per-turn input tokens and time-to-first-token between the legacy
+# stateless flow (new chat + HISTORY prompt with the last 15 messages every turn)
+# and the pooled ChatSession flow. Both send at most CHAT_HISTORY_WINDOW prior
+# messages, and the SDK ChatSession resends its history every turn, so input
+# tokens should be roughly equal; differences come from prompt formatting.
+# cached_tok is whatever Vertex implicit caching served for repeated prefixes.
+# The conversation runs past the window so both flows are compared at full window.
+# Usage: python scripts/benchmark_agent.py
+
+TURNS = [
+    "Promociones para Turquía",
+    "Dame el detalle del circuito de 8 días",
+    "¿Qué incluye y cuál es el precio?",
+    "¿Tiene salidas en mayo?",
+    "¿Y opciones combinadas con Grecia?",
+    "Detalle del combinado Turquía + Grecia",
+    "¿Cuántas noches en Estambul?",
+    "¿Qué no incluye?",
+    "¿Hay descuento para niños?",
+    "Compara ambos planes en precio y duración",
+    "¿Qué notas importantes tiene el combinado?",
+    "Resume las dos opciones con su Tour ID",
+]
+
+def send_streaming(chat, prompt):
+    """Sends prompt with streaming and returns (ttft_ms, total_ms, prompt_tokens, cached_tokens, text)."""
+    start = time.perf_counter()
+    ttft_ms = None
+    last_chunk = None
+    parts = []
+    for chunk in chat.send_message(prompt, stream=True):
+        if ttft_ms is None:
+            ttft_ms = (time.perf_counter() - start) * 1000
+        try:
+            parts.append(chunk.text)
+        except (ValueError, AttributeError):
+            pass  # Chunks carrying only metadata have no text
+        last_chunk = chunk
+    total_ms = (time.perf_counter() - start) * 1000
+    usage = getattr(last_chunk, "usage_metadata", None)
+    return (
+        ttft_ms or total_ms,
+        total_ms,
+        getattr(usage, "prompt_token_count", 0),
+        getattr(usage, "cached_content_token_count", 0),
+        "".join(parts),
+    )
+
+def run_legacy():
+    history = []
+    results = []
+    for message in TURNS:
+        # Same prompt construction as api/main.py
+        formatted_history = "\n".join([f"{m.get('role', 'unknown')}: {m.get('content', '')}" for m in history[-travel_agent.CHAT_HISTORY_WINDOW:]])
+        full_prompt = f"HISTORY:\n{formatted_history}\n\nUSER:\n{message}"
+        chat = root_agent.model.start_chat()
+        ttft_ms, total_ms, prompt_tokens, cached_tokens, text = send_streaming(chat, full_prompt)
+        results.append((ttft_ms, total_ms, prompt_tokens, cached_tokens))
+        history += [{"role": "user", "content": message}, {"role": "model", "content": text}]
+    return results
+
+def run_pooled():
+    session_id = str(uuid.uuid4())
+    history = []
+    results = []
+    for message in TURNS:
+        chat, _ = root_agent.chat_for(session_id, history)
+        ttft_ms, total_ms, prompt_tokens, cached_tokens, text = send_streaming(chat, message)
+        results.append((ttft_ms, total_ms, prompt_tokens, cached_tokens))
+        history += [{"role": "user", "content": message}, {"role": "model", "content": text}]
+    root_agent.evict(session_id)
+    return results
+
+def report(name, results):
+    print(f"\n--- {name} ---")
+    print(f"{'turn':>4} {'ttft_ms':>9} {'total_ms':>9} {'input_tok':>10} {'cached_tok':>11}")
+    for i, (ttft_ms, total_ms, prompt_tokens, cached_tokens) in enumerate(results, 1):
+        print(f"{i:>4} {ttft_ms:>9.0f} {total_ms:>9.0f} {prompt_tokens:>10} {cached_tokens:>11}")
+    billed = sum(r[2] - r[3] for r in results)
+    avg_ttft = sum(r[0] for r in results) / len(results)
+    print(f"uncached input tokens: {billed}  avg ttft: {avg_ttft:.0f} ms")
+    return billed, avg_ttft
+
+if __name__ == "__main__":
+    if not hasattr(root_agent, "chat_for"):
+        print("Benchmark requires the standard Vertex AI SDK agent (google.adk is installed).")
+        sys.exit(1)
+
+    print(f"Model: {travel_agent.MODEL_NAME}  turns: {len(TURNS)}  history window: {travel_agent.CHAT_HISTORY_WINDOW}")
+    legacy_tokens, legacy_ttft = report("Legacy (stateless, full HISTORY prompt)", run_legacy())
+    pooled_tokens, pooled_ttft = report("Pooled ChatSession", run_pooled())
+
+    print("\n--- Summary ---")
+    if legacy_tokens:
+        print(f"Uncached input tokens: {legacy_tokens} -> {pooled_tokens} ({100 * (pooled_tokens / legacy_tokens - 1):+.0f}%)")
+    print(f"Avg TTFT: {legacy_ttft:.0f} ms -> {pooled_ttft:.0f} ms")
+    print("Note: both flows send at most the same history window each turn; differences")
+    print("come from prompt formatting (no 'role:' prefixes) and implicit caching, not from the pool.")
@@ -0,0 +1,115 @@
+import unittest
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.chat_pool import ChatPool, to_turns
+
+class FakeChat:
+    def __init__(self, turns):
+        self.history = [text for _, texts in turns for text in texts]
+        self.fail = False
+        self.sent_history_lens = []
+
+    def send_message(self, prompt):
+        if self.fail:
+            raise RuntimeError("boom")
+        self.sent_history_lens.append(len(self.history))
+        self.history += [prompt, "answer"]
+        return "answer"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def msgs(n):
+    return [{"role": "user" if i % 2 == 0 else "model", "content": f"m{i}"} for i in range(n)]
+
+class TestChatPool(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.pool = ChatPool(max_size=2, idle_seconds=60, window=15, clock=self.clock)
+        self.built = 0
+
+    def start_chat(self, turns):
+        self.built += 1
+        return FakeChat(turns)
+
+    def turn(self, session_id, history):
+        chat, reused = self.pool.get(session_id, history, self.start_chat)
+        self.pool.send(session_id, chat, "q")
+        return chat, reused
+
+    def test_reuses_chat_when_history_matches(self):
+        chat1, reused1 = self.turn("a", [])
+        chat2, reused2 = self.turn("a", msgs(2))
+        self.assertFalse(reused1)
+        self.assertTrue(reused2)
+        self.assertIs(chat1, chat2)
+        self.assertEqual(self.built, 1)
+
+    def test_lru_capacity_eviction(self):
+        self.turn("a", [])
+        self.turn("b", [])
+        self.turn("a", msgs(2))  # "b" is now least recently used
+        self.turn("c", [])
+        self.assertIn("a", self.pool)
+        self.assertNotIn("b", self.pool)
+        self.assertEqual(len(self.pool), 2)
+
+    def test_idle_eviction(self):
+        self.turn("a", [])
+        self.clock.now += 61
+        self.turn("b", [])
+        self.assertNotIn("a", self.pool)
+
+    def test_rebuild_on_history_length_mismatch(self):
+        self.turn("a", [])
+        # Another instance served a turn: repository has 4 messages, pool expects 2
+        _, reused = self.turn("a", msgs(4))
+        self.assertFalse(reused)
+        self.assertEqual(self.built, 2)
+
+    def test_never_sends_more_than_window(self):
+        history = []
+        reused_flags = []
+        sent = []
+        for _ in range(12):
+            chat, reused = self.turn("a", history)
+            reused_flags.append(reused)
+            sent.append(chat.sent_history_lens[-1])
+            history = msgs(len(history) + 2)
+        # Reused while the chat holds <= 15 messages (turns 1-7), rebuilt from then on
+        self.assertEqual(reused_flags, [False] + [True] * 7 + [False] * 4)
+        self.assertLessEqual(max(sent), 15)
+
+    def test_send_failure_evicts(self):
+        chat, _ = self.pool.get("a", [], self.start_chat)
+        chat.fail = True
+        with self.assertRaises(RuntimeError):
+            self.pool.send("a", chat, "q")
+        self.assertNotIn("a", self.pool)
+
+class TestToTurns(unittest.TestCase):
+
+    def test_drops_leading_model_and_merges_same_role(self):
+        history = [
+            {"role": "model", "content": "orphan"},
+            {"role": "user", "content": "u1"},
+            {"role": "user", "content": "u2"},
+            {"role": "model", "content": "a1"},
+            {"role": "system", "content": "ignored"},
+        ]
+        self.assertEqual(to_turns(history, 15), [("user", ["u1", "u2"]), ("model", ["a1"])])
+
+    def test_applies_window(self):
+        self.assertEqual(to_turns(msgs(20), 4), [("user", ["m16"]), ("model", ["m17"]), ("user", ["m18"]), ("model", ["m19"])])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents import grounding
+
+SOURCES = [{
+    "uri": "gs://promos/turquia.pdf",
+    "title": "Turquia",
+    "text": "Tour ID: TR-2041 Cuentos de Sheherezade. 8 Días. Precio desde USD 1.290 por persona.",
+}]
+
+class TestGrounding(unittest.TestCase):
+
+    def test_supported_claims_pass(self):
+        content = "- Tour ID: TR-2041\n- Duración: 8 dias\n- Precio: $1,290"
+        report = grounding.validate(content, SOURCES)
+        self.assertEqual(report.status, grounding.PASSED)
+        self.assertEqual(report.claims, 3)
+
+    def test_unsupported_claims_fail(self):
+        content = "Tour ID: TR-9999, 10 días, USD 990"
+        report = grounding.validate(content, SOURCES)
+        self.assertEqual(report.status, grounding.FAILED)
+        self.assertEqual([u["kind"] for u in report.unsupported], ["tour_id", "duration", "price"])
+
+    def test_no_sources_attribute_is_unverifiable(self):
+        report = grounding.validate("Tour ID: TR-2041", None)
+        self.assertEqual(report.status, grounding.UNVERIFIABLE)
+
+    def test_not_available_answer_passes(self):
+        report = grounding.validate("Tour ID: No encontrado. Dato no disponible en promociones", [])
+        self.assertEqual(report.status, grounding.PASSED)
+
+    def test_enforce_flag_and_strip(self):
+        content = "Tour ID: TR-2041, 12 días"
+        report = grounding.validate(content, SOURCES)
+        self.assertIn("⚠️", grounding.enforce(content, report, mode="flag"))
+        stripped = grounding.enforce(content, report, mode="strip")
+        self.assertNotIn("12 días", stripped)
+        self.assertIn(grounding.NOT_AVAILABLE, stripped)
+
+    def test_price_with_cents_in_source_matches_whole_amount(self):
+        sources = [{"uri": "gs://promos/t.pdf", "title": "T", "text": "Precio: USD 1.290,00 por persona"}]
+        for content in ("Precio: USD 1.290", "1.290 USD por persona", "$1,290.00"):
+            report = grounding.validate(content, sources)
+            self.assertEqual(report.status, grounding.PASSED, content)
+        self.assertEqual(grounding.validate("USD 1.290,50", sources).status, grounding.FAILED)
+
+    def test_price_only_matches_currency_amounts(self):
+        # "8" appears in the source only as a duration
+        report = grounding.validate("USD 8", SOURCES)
+        self.assertEqual(report.status, grounding.FAILED)
+
+    def test_partial_tour_id_fails(self):
+        report = grounding.validate("Tour ID: 2041", SOURCES)
+        self.assertEqual(report.status, grounding.FAILED)
+
+    def test_strip_keeps_tour_id_label(self):
+        content = "Tour ID: TR-9999 – Cuentos de Sheherezade"
+        report = grounding.validate(content, SOURCES)
+        stripped = grounding.enforce(content, report, mode="strip")
+        self.assertEqual(stripped, f"Tour ID: {grounding.NOT_AVAILABLE} – Cuentos de Sheherezade")
+
+    def test_price_currency_must_match(self):
+        self.assertEqual(grounding.validate("Precio: €1.290", SOURCES).status, grounding.FAILED)
+        for content in ("Precio: $1.290", "Precio: US$ 1.290", "1.290 dólares"):
+            self.assertEqual(grounding.validate(content, SOURCES).status, grounding.PASSED, content)
+
+    def test_amount_with_one_decimal_digit(self):
+        sources = [{"uri": "gs://promos/t.pdf", "title": "T", "text": "Tasa USD 1,20 y total USD 1.290,50"}]
+        for content in ("USD 1.2", "USD 1,290.5"):
+            self.assertEqual(grounding.validate(content, sources).status, grounding.PASSED, content)
+
+    def test_tour_id_in_table_row_and_list(self):
+        for content in ("| Tour ID | TR-9999 |", "Tour IDs: TR-2041, TR-9999", "Tour IDs: TR-2041 y TR-9999"):
+            report = grounding.validate(content, SOURCES)
+            self.assertEqual(report.status, grounding.FAILED, content)
+            self.assertEqual([u["value"] for u in report.unsupported], ["TR-9999"])
+
+    def test_tour_id_in_table_column(self):
+        content = "| Tour ID | Nombre |\n|---|---|\n| TR-2041 | Sheherezade |\n| TR-9999 | Inventado |"
+        report = grounding.validate(content, SOURCES)
+        self.assertEqual([u["value"] for u in report.unsupported], ["TR-9999"])
+
+    def test_tour_id_list_stops_at_other_numbers(self):
+        report = grounding.validate("Tour ID: TR-2041, 8 días", SOURCES)
+        self.assertEqual(report.status, grounding.PASSED)
+
+    def test_strip_replaces_whole_price_keeping_label(self):
+        for content in ("Precio: $990 por persona", "Precio: 990 USD por persona"):
+            report = grounding.validate(content, SOURCES)
+            stripped = grounding.enforce(content, report, mode="strip")
+            self.assertEqual(stripped, f"Precio: {grounding.NOT_AVAILABLE} por persona")
+
+    def test_title_cache_is_bounded(self):
+        with patch.object(grounding, "_TITLE_CACHE_SIZE", 2):
+            for name in ("a", "b", "c"):
+                grounding.resolve_title(f"gs://promos/{name}.pdf")
+            self.assertEqual(len(grounding._TITLE_CACHE), 2)
+            self.assertNotIn("gs://promos/a.pdf", grounding._TITLE_CACHE)
+
+    def test_collect_sources_dedupes_and_resolves_titles(self):
+        def chunk(uri, title, text):
+            return SimpleNamespace(retrieved_context=SimpleNamespace(uri=uri, title=title, text=text))
+        chunks = [
+            chunk("gs://promos/peru.pdf", "Peru Magico", "A"),
+            chunk("gs://promos/peru.pdf", None, "B"),
+            chunk("gs://promos/chile.pdf", None, "C"),
+        ]
+        sources = grounding.collect_sources(chunks)
+        self.assertEqual([s["uri"] for s in sources], ["gs://promos/peru.pdf", "gs://promos/chile.pdf"])
+        self.assertEqual(sources[0]["text"], "A\nB")
+        self.assertEqual(sources[1]["title"], "chile")
+        self.assertEqual(grounding.resolve_title("gs://promos/peru.pdf"), "Peru Magico")
+
+if __name__ == '__main__':
+    unittest.main()
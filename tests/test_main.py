@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+import sys
+import os
+import types
+import uuid
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# api.main builds the Vertex agent at import time; every test replaces root_agent anyway
+_fake_agent_module = types.ModuleType("agents.travel_agent")
+_fake_agent_module.root_agent = None
+with patch.dict(sys.modules, {"agents.travel_agent": _fake_agent_module}):
+    from api import main
+
+SOURCES = [{"uri": "gs://promos/turquia.pdf", "title": "Turquia", "text": "Tour ID: TR-2041. 8 días. USD 1.290"}]
+GOOD = "Tour ID: TR-2041, 8 días, USD 1.290"
+BAD = "Tour ID: TR-2041, 8 días, USD 990"
+
+def agent_response(text):
+    usage = {"prompt_tokens": 100, "cached_tokens": 0, "latency_ms": 5.0, "pooled": True}
+    return SimpleNamespace(text=text, citations=["gs://promos/turquia.pdf"], sources=SOURCES, usage=usage)
+
+class TestSendMessage(unittest.TestCase):
+
+    def setUp(self):
+        self.session_id = str(uuid.uuid4())
+        self.agent = MagicMock()
+        self.agent.supports_sessions = True
+        self.repository = MagicMock()
+        self.repository.get_session.return_value = []
+        patchers = [
+            patch.object(main, "root_agent", self.agent),
+            patch.object(main, "repository", self.repository),
+            patch.dict(os.environ, {"GROUNDING_MODE": "flag"}),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def send(self, message="Detalle Turquía"):
+        req = main.MessageRequest(session_id=self.session_id, message=message)
+        return asyncio.run(main.send_message(req, x_idempotency_key=None))
+
+    def saved_model_message(self):
+        return self.repository.save_message.call_args_list[-1].args[1]
+
+    def test_passing_response_has_no_retry_or_evict(self):
+        self.agent.query.return_value = agent_response(GOOD)
+        resp = self.send()
+
+        self.assertEqual(resp.response, GOOD)
+        self.assertEqual(self.agent.query.call_count, 1)
+        self.agent.evict.assert_not_called()
+        metadata = self.saved_model_message()["metadata"]
+        self.assertEqual(metadata["grounding"]["status"], "passed")
+        self.assertEqual(metadata["grounding"]["retries"], 0)
+        self.assertEqual(metadata["usage"]["prompt_tokens"], 100)
+
+    def test_failure_then_passing_retry(self):
+        self.agent.query.side_effect = [agent_response(BAD), agent_response(GOOD)]
+        resp = self.send("Detalle Turquía")
+
+        self.assertEqual(resp.response, GOOD)
+        retry_call = self.agent.query.call_args_list[1]
+        self.assertIn("VERIFICACIÓN", retry_call.args[0])
+        self.assertIn("USD 990", retry_call.args[0])
+        self.assertEqual(retry_call.kwargs["session_id"], self.session_id)
+        # Evicted before the retry and again after it, since the pooled chat holds the correction
+        self.assertEqual(self.agent.evict.call_count, 2)
+        saved = self.saved_model_message()
+        self.assertEqual(saved["content"], GOOD)
+        self.assertEqual(saved["metadata"]["grounding"]["status"], "passed")
+        self.assertEqual(saved["metadata"]["grounding"]["retries"], 1)
+
+    def test_retry_limit_and_flagged_content_persisted(self):
+        self.agent.query.return_value = agent_response(BAD)
+        with patch.object(main, "GROUNDING_MAX_RETRIES", 2):
+            resp = self.send()
+
+        self.assertEqual(self.agent.query.call_count, 3)
+        self.assertEqual(self.agent.evict.call_count, 3)
+        saved = self.saved_model_message()
+        self.assertIn("⚠️ Datos no verificados en promociones: USD 990", saved["content"])
+        self.assertEqual(resp.response, saved["content"])
+        grounding_meta = saved["metadata"]["grounding"]
+        self.assertEqual(grounding_meta["status"], "failed")
+        self.assertEqual(grounding_meta["retries"], 2)
+        self.assertEqual(grounding_meta["unsupported"], [{"kind": "price", "text": "USD 990", "value": "990"}])
+
+    def test_no_retry_when_disabled(self):
+        self.agent.query.return_value = agent_response(BAD)
+        with patch.object(main, "GROUNDING_MAX_RETRIES", 0):
+            self.send()
+
+        self.assertEqual(self.agent.query.call_count, 1)
+        # Still evicted: the pooled chat holds the unflagged answer
+        self.agent.evict.assert_called_once_with(self.session_id)
+
+if __name__ == '__main__':
+    unittest.main()